@@ -1,6 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine, text
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import connectorx as cx
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.pool import QueuePool
+
+from scoring import build_weight_matrices, compute_final_match_rates, compute_tv_match
 
 # -------------------------------------------------
 # 1. CONFIG & DB CONNECTION
@@ -18,311 +27,475 @@ st.caption("Professional minimalist dashboard – powered by Supabase & SQL Tale
 # 🔹 Ambil DB_URL dari secrets
 DB_URL = st.secrets["DB_URL"]
 
-# 🔹 Siapkan SQLAlchemy engine
-engine = create_engine(DB_URL, pool_pre_ping=True)
+# 🔹 connectorx butuh URL libpq biasa (tanpa suffix driver SQLAlchemy, mis. +psycopg2)
+CX_DB_URL = make_url(DB_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+
+# 🔹 Mode B membaca baseline dari materialized view (sql/001_baseline_materialized_views.sql)
+USE_BASELINE_MV = st.secrets.get("USE_BASELINE_MV", True)
+
+# 🔹 Skor TV per karyawan dibaca dari materialized view (sql/003_employee_tv_scores.sql)
+USE_TV_SCORES_MV = st.secrets.get("USE_TV_SCORES_MV", True)
+
+# 🔹 Siapkan SQLAlchemy engine (sekali per proses, bertahan antar rerun)
+@st.cache_resource
+def get_engine():
+    return create_engine(
+        DB_URL,
+        poolclass=QueuePool,
+        pool_size=3,
+        max_overflow=4,
+        pool_recycle=1800,
+        pool_pre_ping=False,
+        connect_args={
+            # TCP keepalive supaya koneksi idle tidak diputus diam-diam oleh Supabase
+            "keepalives": 1,
+            "keepalives_idle": 30,
+            "keepalives_interval": 10,
+            "keepalives_count": 5,
+            "application_name": "talent-match",
+        },
+    )
+
+engine = get_engine()
+
+# 🔹 (Opsional tapi sangat berguna) — Test koneksi, hanya round-trip sekali per proses
+@st.cache_resource
+def check_connection():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
 
-# 🔹 (Opsional tapi sangat berguna) — Test koneksi
 def test_connection():
     try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        check_connection()
         st.success("✓ Connected to Supabase Postgres database")
+        return True
     except Exception as e:
         st.error("✗ Database Connection FAILED")
         st.exception(e)
+        return False
 
-test_connection()
+# 🔹 Test koneksi sekali per session (diulang hanya jika gagal), bukan di setiap rerun
+if not st.session_state.get("conn_tested"):
+    st.session_state["conn_tested"] = test_connection()
 
 
 # -------------------------------------------------
 # 2. HELPER FUNCTIONS
 # -------------------------------------------------
 
+def read_sql_arrow(sql: str) -> pd.DataFrame:
+    # connectorx: hasil query langsung jadi Arrow buffer (di C), tanpa konversi per-row di Python.
+    # Hanya untuk query tanpa input user; query ber-parameter tetap lewat pd.read_sql + bound params.
+    return cx.read_sql(CX_DB_URL, sql, return_type="arrow").to_pandas()
+
 @st.cache_data(ttl=600)
 def load_positions():
     sql = "SELECT position_id, name FROM dim_positions ORDER BY position_id"
-    return pd.read_sql(sql, engine)
+    return read_sql_arrow(sql)
 
-@st.cache_data(ttl=600)
-def load_high_performers(min_rating: int = 5):
+@st.cache_data(ttl=60)
+def search_high_performers(prefix: str, min_rating: int = 5, limit: int = 50):
+    # Typeahead: hanya ambil HP yang cocok dengan prefix (ID / nama), maksimal `limit` baris
+    pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
     sql = """
-        SELECT DISTINCT e.employee_id, e.fullname
+        SELECT e.employee_id, e.fullname
         FROM employees e
-        JOIN performance_yearly py USING(employee_id)
-        WHERE py.rating >= :min_rating
+        JOIN employee_hp_ratings hr USING(employee_id)
+        WHERE hr.max_rating >= :min_rating
+          AND (e.employee_id ILIKE :pattern OR e.fullname ILIKE :pattern)
         ORDER BY e.fullname
+        LIMIT :limit
     """
-    return pd.read_sql(text(sql), engine, params={"min_rating": min_rating})
+    params = {"min_rating": int(min_rating), "pattern": pattern, "limit": int(limit)}
+    df = pd.read_sql(text(sql), engine, params=params)
+    df["label"] = df["employee_id"].str.cat(df["fullname"], sep=" – ")
+    # Mapping label → employee_id dibangun sekali saat load (ikut di-cache)
+    return df, dict(zip(df["label"], df["employee_id"]))
+
+def load_employee_names(employee_ids: list) -> pd.DataFrame:
+    # Hanya nama untuk top-N hasil ranking, bukan seluruh tabel employees
+    sql = "SELECT employee_id, fullname FROM employees WHERE employee_id = ANY(CAST(:ids AS text[]))"
+    return pd.read_sql(text(sql), engine, params={"ids": list(employee_ids)})
+
+@st.cache_data(ttl=3600)
+def load_tv_weights():
+    # Matriks bobot TV → TGV (W, A), lihat scoring.build_weight_matrices
+    df = read_sql_arrow("SELECT tv_name, tgv_name, tv_weight FROM talent_variables_mapping")
+    return build_weight_matrices(df)
+
+@st.cache_data(ttl=3600)
+def load_tgv_weights() -> pd.Series:
+    df = read_sql_arrow("SELECT tgv_name, tgv_weight FROM talent_group_weights")
+    return df.groupby("tgv_name")["tgv_weight"].sum().astype(float)
+
+@st.cache_data(ttl=3600)
+def load_latest_comp_year() -> int:
+    with engine.connect() as conn:
+        return int(conn.execute(text("SELECT MAX(year) FROM competencies_yearly")).scalar())
+
+@st.cache_data(ttl=3600)
+def load_server_version() -> int:
+    with engine.connect() as conn:
+        return int(conn.execute(text("SHOW server_version_num")).scalar())
+
+def median_sql(column: str) -> str:
+    # Median baseline: sama persis dengan mv_baseline_*_by_role (sql/001) agar Mode A / B konsisten
+    return f"PERCENTILE_DISC(0.5) WITHIN GROUP (ORDER BY {column})"
+
+def cte_hints(server_version_num: int):
+    # PG12+ mendukung AS [NOT] MATERIALIZED; versi < 12 selalu materialize CTE
+    if server_version_num >= 120000:
+        return "MATERIALIZED ", "NOT MATERIALIZED "
+    return "", ""
 
 
 # -------------------------------------------------
 # 3. BUILD TALENT MATCH SQL ENGINE
 # -------------------------------------------------
+# Engine dipecah jadi 2 query (SQL text konstan per shape, input via bound parameter):
+#   1. build_baseline_sql  → benchmark + baseline per TV (atau dari MV Mode B)
+#   2. build_scores_sql    → skor user per TV untuk semua karyawan aktif
+# Kedua query independen, dijalankan paralel; weighted sum dihitung di client.
+
+def tv_scores_sql(comp_year: int, server_version_num: int, materialize: bool) -> str:
+    # Skor per (employee, TV) dalam format long: employee_id, tv_source, tv_name, user_score, user_value
+    mat, not_mat = cte_hints(server_version_num)
+
+    if USE_TV_SCORES_MV:
+        return f"""
+tv_scores AS {not_mat}(
+    SELECT employee_id, tv_source, tv_name, user_score, user_value
+    FROM employee_tv_scores
+),
+"""
 
-def build_match_sql(manual_hp_ids, role_position_id, min_hp_rating: int) -> str:
+    # Tahun terakhir di-inline sebagai literal int → constant folding / partition pruning
+    return f"""
+-- Sama dengan definisi sql/003_employee_tv_scores.sql, dihitung on-the-fly
+tv_scores AS {mat if materialize else not_mat}(
+    SELECT c.employee_id, 'competency' AS tv_source, c.pillar_code AS tv_name,
+           c.score::numeric AS user_score, NULL::text AS user_value
+    FROM competencies_yearly c
+    WHERE c.year = {int(comp_year)}
 
-    # Mode A: Manual HP
-    if manual_hp_ids:
-        manual_list_sql = ",".join(f"'{emp}'" for emp in manual_hp_ids)
-        manual_array_sql = f"ARRAY[{manual_list_sql}]::text[]"
-    else:
-        manual_array_sql = "ARRAY[]::text[]"
+    UNION ALL
+    SELECT p.employee_id, 'psych', v.tv_name, v.user_score, NULL
+    FROM profiles_psych p
+    CROSS JOIN LATERAL (VALUES
+        ('iq', p.iq::numeric), ('gtq', p.gtq::numeric), ('tiki', p.tiki::numeric),
+        ('faxtor', p.faxtor::numeric), ('pauli', p.pauli::numeric)
+    ) AS v(tv_name, user_score)
+
+    UNION ALL
+    SELECT ps.employee_id, 'papi', ps.scale_code, ps.score::numeric, NULL
+    FROM papi_scores ps
+
+    UNION ALL
+    SELECT p.employee_id, 'cat', v.tv_name, NULL, v.user_value
+    FROM profiles_psych p
+    CROSS JOIN LATERAL (VALUES
+        ('mbti', UPPER(TRIM(p.mbti))), ('disc', UPPER(TRIM(p.disc)))
+    ) AS v(tv_name, user_value)
+),
+"""
 
-    # Mode B: Role-based
-    role_sql = "NULL" if role_position_id is None else str(role_position_id)
 
-    # RAW SQL ENGINE – sudah aman
-    sql = f"""
-WITH params AS (
+PARAMS_SQL = """
+params AS (
     SELECT
-        {manual_array_sql} AS manual_hp,
-        {role_sql}::int AS role_position_id,
-        {min_hp_rating}::int AS min_hp_rating
+        CAST(:role_position_id AS int) AS role_position_id,
+        CAST(:min_hp_rating AS int) AS min_hp_rating
 ),
+"""
+
+BASELINE_TV_SQL = """
+SELECT tv_name, baseline_score::float8 AS baseline_score, FALSE AS is_reverse, NULL::text AS baseline_value
+FROM baseline_numeric
+UNION ALL
+SELECT tv_name, baseline_score::float8, is_reverse, NULL FROM baseline_papi
+UNION ALL
+SELECT tv_name, NULL, FALSE, baseline_value FROM baseline_cat;
+"""
 
+
+def bench_sql(server_version_num: int) -> str:
+    # Benchmark (Mode A / Mode B tanpa MV) sebagai CTE di dalam query baseline
+    mat, _ = cte_hints(server_version_num)
+
+    return f"""
 manual_set AS (
-    SELECT unnest(manual_hp) AS employee_id FROM params
+    SELECT unnest(CAST(:manual_hp AS text[])) AS employee_id
 ),
 
 role_set AS (
-    SELECT DISTINCT e.employee_id
+    SELECT e.employee_id
     FROM employees e
-    JOIN performance_yearly py USING(employee_id)
+    JOIN employee_hp_ratings hr USING(employee_id)
     JOIN params p ON TRUE
-    WHERE py.rating >= p.min_hp_rating
+    WHERE hr.max_rating >= p.min_hp_rating
       AND p.role_position_id IS NOT NULL
       AND e.position_id = p.role_position_id
 ),
 
-benchmark_set AS (
+benchmark_set AS {mat}(
     SELECT employee_id FROM manual_set
     UNION
     SELECT employee_id FROM role_set
 ),
 
 fallback_benchmark AS (
-    SELECT py.employee_id
-    FROM performance_yearly py
+    SELECT hr.employee_id
+    FROM employee_hp_ratings hr
     JOIN params p ON TRUE
-    WHERE py.rating >= p.min_hp_rating
+    WHERE hr.max_rating >= p.min_hp_rating
 ),
 
 final_bench AS (
-    SELECT DISTINCT employee_id FROM benchmark_set
+    SELECT employee_id FROM benchmark_set
     UNION
-    SELECT DISTINCT employee_id FROM fallback_benchmark
+    SELECT employee_id FROM fallback_benchmark
     WHERE NOT EXISTS (SELECT 1 FROM benchmark_set)
 ),
+"""
 
-latest AS (
-    SELECT (SELECT MAX(year) FROM competencies_yearly) AS comp_year
-),
 
+@lru_cache(maxsize=None)
+def build_baseline_sql(use_role_mv: bool, comp_year: int, server_version_num: int) -> str:
+    mat, not_mat = cte_hints(server_version_num)
+
+    # Mode B murni → baseline langsung dari materialized view
+    if use_role_mv:
+        return f"""
+WITH {PARAMS_SQL}
 baseline_numeric AS (
-    SELECT 
-        tv_name,
-        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY score) AS baseline_score
-    FROM (
-        SELECT c.pillar_code AS tv_name, c.score::numeric AS score
-        FROM competencies_yearly c
-        JOIN latest l ON c.year = l.comp_year
-        WHERE c.employee_id IN (SELECT employee_id FROM final_bench)
-
-        UNION ALL SELECT 'iq', p.iq::numeric FROM profiles_psych p WHERE p.employee_id IN (SELECT employee_id FROM final_bench)
-        UNION ALL SELECT 'gtq', p.gtq::numeric FROM profiles_psych p WHERE p.employee_id IN (SELECT employee_id FROM final_bench)
-        UNION ALL SELECT 'tiki', p.tiki::numeric FROM profiles_psych p WHERE p.employee_id IN (SELECT employee_id FROM final_bench)
-        UNION ALL SELECT 'faxtor', p.faxtor::numeric FROM profiles_psych p WHERE p.employee_id IN (SELECT employee_id FROM final_bench)
-        UNION ALL SELECT 'pauli', p.pauli::numeric FROM profiles_psych p WHERE p.employee_id IN (SELECT employee_id FROM final_bench)
-    ) x
-    GROUP BY tv_name
+    SELECT b.tv_name, b.baseline_score
+    FROM mv_baseline_numeric_by_role b
+    JOIN params p ON b.role_position_id = p.role_position_id
+                 AND b.min_rating = p.min_hp_rating
 ),
 
-all_numeric_scores AS (
-    SELECT c.employee_id, c.pillar_code AS tv_name, c.score::numeric AS user_score
-    FROM competencies_yearly c
-    JOIN latest l ON c.year = l.comp_year
+baseline_papi AS (
+    SELECT b.tv_name, b.baseline_score, b.is_reverse
+    FROM mv_baseline_papi_by_role b
+    JOIN params p ON b.role_position_id = p.role_position_id
+                 AND b.min_rating = p.min_hp_rating
+),
 
-    UNION ALL SELECT employee_id, 'iq', iq::numeric FROM profiles_psych
-    UNION ALL SELECT employee_id, 'gtq', gtq::numeric FROM profiles_psych
-    UNION ALL SELECT employee_id, 'tiki', tiki::numeric FROM profiles_psych
-    UNION ALL SELECT employee_id, 'faxtor', faxtor::numeric FROM profiles_psych
-    UNION ALL SELECT employee_id, 'pauli', pauli::numeric FROM profiles_psych
+baseline_cat AS (
+    SELECT b.tv_name, b.baseline_value
+    FROM mv_baseline_cat_by_role b
+    JOIN params p ON b.role_position_id = p.role_position_id
+                 AND b.min_rating = p.min_hp_rating
+)
+{BASELINE_TV_SQL}"""
+
+    return f"""
+WITH {PARAMS_SQL}{bench_sql(server_version_num)}{tv_scores_sql(comp_year, server_version_num, materialize=False)}
+bench_scores AS {mat}(
+    SELECT sc.*
+    FROM tv_scores sc
+    JOIN final_bench fb ON fb.employee_id = sc.employee_id
 ),
 
-numeric_tv AS (
+baseline_numeric AS (
     SELECT
-        sc.employee_id,
-        bn.tv_name,
-        bn.baseline_score,
-        sc.user_score,
-        (sc.user_score / NULLIF(bn.baseline_score,0)) * 100 AS tv_match_rate
-    FROM all_numeric_scores sc
-    JOIN baseline_numeric bn ON sc.tv_name = bn.tv_name
+        tv_name,
+        {median_sql('user_score')} AS baseline_score
+    FROM bench_scores
+    WHERE tv_source IN ('competency', 'psych')
+    GROUP BY tv_name
 ),
 
-reverse_list AS (
+reverse_list AS {not_mat}(
     SELECT UNNEST(ARRAY['Papi_I','Papi_K','Papi_Z','Papi_T']) AS scale_code
 ),
 
 baseline_papi AS (
     SELECT
-        ps.scale_code AS tv_name,
-        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY ps.score) AS baseline_score,
+        sc.tv_name,
+        {median_sql('sc.user_score')} AS baseline_score,
         CASE WHEN rl.scale_code IS NULL THEN FALSE ELSE TRUE END AS is_reverse
-    FROM papi_scores ps
-    JOIN final_bench fb ON ps.employee_id = fb.employee_id
-    LEFT JOIN reverse_list rl ON rl.scale_code = ps.scale_code
-    GROUP BY ps.scale_code, rl.scale_code
+    FROM bench_scores sc
+    LEFT JOIN reverse_list rl ON rl.scale_code = sc.tv_name
+    WHERE sc.tv_source = 'papi'
+    GROUP BY sc.tv_name, rl.scale_code
 ),
 
-papi_tv AS (
-    SELECT
-        ps.employee_id,
-        bp.tv_name,
-        bp.baseline_score,
-        ps.score::numeric AS user_score,
-        CASE 
-            WHEN bp.is_reverse THEN ((2 * bp.baseline_score - ps.score::numeric) / NULLIF(bp.baseline_score,0)) * 100
-            ELSE (ps.score::numeric / NULLIF(bp.baseline_score,0)) * 100
-        END AS tv_match_rate
-    FROM papi_scores ps
-    JOIN baseline_papi bp ON ps.scale_code = bp.tv_name
+-- MBTI & DISC selalu ada (NULL jika benchmark tanpa profil psikologi → semua skor 0)
+cat_tv AS {not_mat}(
+    SELECT tv_name FROM (VALUES ('mbti'), ('disc')) AS t(tv_name)
 ),
 
 baseline_cat AS (
     SELECT
-        'mbti' AS tv_name,
-        MODE() WITHIN GROUP (ORDER BY UPPER(TRIM(mbti))) AS baseline_value
-    FROM profiles_psych p
-    JOIN final_bench fb ON fb.employee_id = p.employee_id
+        ct.tv_name,
+        MODE() WITHIN GROUP (ORDER BY sc.user_value) AS baseline_value
+    FROM cat_tv ct
+    LEFT JOIN bench_scores sc ON sc.tv_name = ct.tv_name AND sc.tv_source = 'cat'
+    GROUP BY ct.tv_name
+)
+{BASELINE_TV_SQL}"""
 
-    UNION ALL
-    SELECT
-        'disc',
-        MODE() WITHIN GROUP (ORDER BY UPPER(TRIM(disc)))
-    FROM profiles_psych p
-    JOIN final_bench fb ON fb.employee_id = p.employee_id
-),
 
-categorical_tv AS (
-    SELECT
-        p.employee_id,
-        bc.tv_name,
-        1::numeric AS baseline_score,
-        1::numeric AS user_score,
-        CASE 
-            WHEN (bc.tv_name='mbti' AND UPPER(TRIM(p.mbti)) = bc.baseline_value)
-              OR (bc.tv_name='disc' AND UPPER(TRIM(p.disc)) = bc.baseline_value)
-            THEN 100 ELSE 0 END AS tv_match_rate
-    FROM profiles_psych p
-    CROSS JOIN baseline_cat bc
-),
+@lru_cache(maxsize=None)
+def build_scores_sql(comp_year: int, server_version_num: int) -> str:
+    mat, _ = cte_hints(server_version_num)
 
-all_tv AS (
-    SELECT * FROM numeric_tv
-    UNION ALL
-    SELECT * FROM papi_tv
-    UNION ALL
-    SELECT * FROM categorical_tv
-),
+    return f"""
+WITH {tv_scores_sql(comp_year, server_version_num, materialize=True)}
+-- Hanya karyawan dengan data kompetensi tahun terakhir yang diranking
+active_employees AS {mat}(
+    SELECT DISTINCT employee_id
+    FROM tv_scores
+    WHERE tv_source = 'competency'
+)
 
-tv_map AS (
-    SELECT tv_name, tgv_name, tv_weight
-    FROM talent_variables_mapping
-),
+SELECT sc.employee_id, sc.tv_source, sc.tv_name, sc.user_score::float8 AS user_score, sc.user_value
+FROM tv_scores sc
+JOIN active_employees ae ON ae.employee_id = sc.employee_id;
+"""
 
-tgv_match AS (
-    SELECT
-        a.employee_id,
-        m.tgv_name,
-        SUM(a.tv_match_rate * m.tv_weight) / SUM(m.tv_weight) AS tgv_match_rate
-    FROM all_tv a
-    JOIN tv_map m USING(tv_name)
-    GROUP BY a.employee_id, m.tgv_name
-),
 
-final_match AS (
-    SELECT
-        t.employee_id,
-        SUM(t.tgv_match_rate * g.tgv_weight) AS final_match_rate
-    FROM tgv_match t
-    JOIN talent_group_weights g USING(tgv_name)
-    GROUP BY t.employee_id
-)
+def fetch_baselines(use_role_mv: bool, comp_year: int, server_version_num: int,
+                    params: dict) -> pd.DataFrame:
+    sql = build_baseline_sql(use_role_mv, comp_year, server_version_num)
+    df = pd.read_sql(text(sql), engine, params=params)
+    # (role, min_rating) belum ada di MV (mis. posisi baru sejak refresh terakhir)
+    # → hitung on-the-fly, termasuk fallback ke semua HP
+    if use_role_mv and df.empty:
+        return fetch_baselines(False, comp_year, server_version_num, params)
+    return df
+
+
+def fetch_scores(comp_year: int, server_version_num: int) -> pd.DataFrame:
+    # Result set terbesar (semua karyawan × TV) dan tanpa parameter → lewat connectorx / Arrow
+    return read_sql_arrow(build_scores_sql(comp_year, server_version_num))
 
-SELECT 
-    e.employee_id,
-    e.fullname,
-    fm.final_match_rate
-FROM final_match fm
-JOIN employees e USING(employee_id)
-ORDER BY final_match_rate DESC
-LIMIT 200;
-"""
-    return sql
 
+@st.cache_data(ttl=300, show_spinner=False)
+def run_match_query(manual_hp_ids: tuple, role_position_id, min_hp_rating: int):
+    # manual_hp_ids dikirim sebagai tuple terurut → cache key tidak tergantung urutan pilihan
+    server_version_num = load_server_version()
+    # comp_year hanya dibutuhkan jika tv_scores dihitung on-the-fly (tanpa materialized view)
+    comp_year = None if USE_TV_SCORES_MV else load_latest_comp_year()
+    # Mode B murni (tanpa manual HP) → baseline diambil dari materialized view
+    use_role_mv = USE_BASELINE_MV and not manual_hp_ids and role_position_id is not None
+    params = {
+        "manual_hp": list(manual_hp_ids or []),
+        "role_position_id": None if role_position_id is None else int(role_position_id),
+        "min_hp_rating": int(min_hp_rating),
+    }
 
-def run_match_query(manual_hp_ids, role_position_id, min_hp_rating):
-    sql = build_match_sql(manual_hp_ids, role_position_id, min_hp_rating)
-    return pd.read_sql(sql, engine)
+    # Baseline (kecil, hanya benchmark) dan skor user (semua karyawan) di koneksi terpisah
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        scores = ex.submit(fetch_scores, comp_year, server_version_num)
+        baselines = ex.submit(fetch_baselines, use_role_mv, comp_year, server_version_num, params)
+        scores_df, baseline_df = scores.result(), baselines.result()
+
+    return compute_final_match(compute_tv_match(scores_df, baseline_df))
+
+
+def compute_final_match(tv_df: pd.DataFrame, limit: int = 200) -> pd.DataFrame:
+    # TV → TGV → final score sebagai perkalian matriks di sisi client (bobot jarang berubah, di-cache)
+    tv_names, tgv_names, W, A = load_tv_weights()
+    result = compute_final_match_rates(tv_df, tv_names, tgv_names, W, A, load_tgv_weights())
+    result = result.nlargest(limit, "final_match_rate")
+
+    result = result.merge(load_employee_names(result["employee_id"].tolist()), on="employee_id", how="inner")
+    return result[["employee_id", "fullname", "final_match_rate"]]
 
 
 # -------------------------------------------------
 # 4. SIDEBAR INPUT
 # -------------------------------------------------
 
-st.sidebar.header("⚙️ Benchmark Settings")
+def sync_hp_selected():
+    # on_change jalan sebelum rerun → pilihan terbaru tersimpan sebelum sidebar dibangun ulang
+    label_to_id = st.session_state["hp_label_to_id"]
+    st.session_state["hp_selected"] = {
+        label: label_to_id[label] for label in st.session_state["hp_multiselect"]
+    }
 
-min_rating = st.sidebar.slider("Minimum rating as High Performer", 1, 5, 5)
+@st.fragment
+def render_sidebar():
+    # Fragment: perubahan widget hanya me-rerun sidebar, bukan seluruh halaman
+    st.header("⚙️ Benchmark Settings")
 
-positions_df = load_positions()
-position_options = {row["name"]: row["position_id"] for _, row in positions_df.iterrows()}
+    min_rating = st.slider("Minimum rating as High Performer", 1, 5, 5)
 
-position_label = st.sidebar.selectbox(
-    "Target Position (Mode B – optional)",
-    ["(None)"] + list(position_options.keys())
-)
+    positions_df = load_positions()
+    position_options = dict(zip(positions_df["name"], positions_df["position_id"]))
 
-selected_position_id = None if position_label == "(None)" else position_options[position_label]
+    position_label = st.selectbox(
+        "Target Position (Mode B – optional)",
+        ["(None)"] + list(position_options.keys())
+    )
 
-hp_df = load_high_performers(min_rating)
-hp_df["label"] = hp_df["employee_id"] + " – " + hp_df["fullname"]
+    selected_position_id = None if position_label == "(None)" else position_options[position_label]
+
+    # HP terpilih disimpan di session_state supaya tetap ada saat hasil pencarian berubah
+    selected = st.session_state.setdefault("hp_selected", {})
+    hp_query = st.text_input("Search HP (ID / nama)")
+    _, label_to_id = search_high_performers(hp_query.strip(), min_rating)
+    label_to_id = {**label_to_id, **selected}
+    st.session_state["hp_label_to_id"] = label_to_id
+
+    # Nilai widget dari session_state (tanpa default) + opsi terurut: memilih HP tidak
+    # mengubah options/default, jadi widget tidak dibuat ulang dan pilihan terakhir tidak hilang
+    st.session_state["hp_multiselect"] = list(selected)
+    manual_selected = st.multiselect(
+        "Manual Benchmark High Performers (Mode A – optional)",
+        options=sorted(label_to_id),
+        key="hp_multiselect",
+        on_change=sync_hp_selected,
+    )
 
-manual_selected = st.sidebar.multiselect(
-    "Manual Benchmark High Performers (Mode A – optional)",
-    options=hp_df["label"].tolist(),
-    default=[]
-)
+    manual_ids = [label_to_id[label] for label in manual_selected]
 
-manual_ids = [
-    label.split(" – ")[0] for label in manual_selected
-]
+    if st.button("🚀 Run Talent Match"):
+        st.session_state["match_inputs"] = {
+            "manual_ids": tuple(sorted(manual_ids)),
+            "position_id": selected_position_id,
+            "position_label": position_label,
+            "min_rating": min_rating,
+        }
+        # Rerun penuh supaya panel hasil ikut ter-render dengan input baru
+        st.rerun()
 
-run_button = st.sidebar.button("🚀 Run Talent Match")
+with st.sidebar:
+    render_sidebar()
 
 
 # -------------------------------------------------
 # 5. MAIN OUTPUT
 # -------------------------------------------------
 
-if run_button:
+@st.fragment
+def render_results():
+    inputs = st.session_state.get("match_inputs")
+    if inputs is None:
+        st.info("Set benchmark di sidebar, lalu klik **Run Talent Match** untuk melihat ranking.")
+        return
+
     with st.spinner("Running Talent Match Engine..."):
-        result_df = run_match_query(manual_ids, selected_position_id, min_rating)
+        result_df = run_match_query(inputs["manual_ids"], inputs["position_id"], inputs["min_rating"])
 
     st.subheader("📊 Ranked Talent List")
 
     st.write(
-        f"Benchmark based on **{len(manual_ids)} manual HP(s)** "
-        f"and **position: {position_label}** (min rating **{min_rating}**)."
+        f"Benchmark based on **{len(inputs['manual_ids'])} manual HP(s)** "
+        f"and **position: {inputs['position_label']}** (min rating **{inputs['min_rating']}**)."
     )
 
-    df_view = result_df.copy()
-    df_view["final_match_rate"] = df_view["final_match_rate"].round(2)
+    # result_df sudah salinan dari st.cache_data → aman dimodifikasi tanpa .copy()
+    df_view = result_df
+    # double (bukan float32): pembulatan hanya untuk tampilan, 87.345 tidak boleh jadi 87.33999633789062
+    df_view["final_match_rate"] = df_view["final_match_rate"].astype("double[pyarrow]").round(2)
 
     st.dataframe(df_view, hide_index=True, use_container_width=True)
 
     if not df_view.empty:
-        top_row = df_view.iloc[0]
+        top_fullname, top_id, top_score = df_view.iloc[0][["fullname", "employee_id", "final_match_rate"]]
         st.markdown("---")
         st.subheader("🏅 Top Match")
 
@@ -330,18 +503,21 @@ if run_button:
         with col1:
             st.markdown(
                 f"""
-                **{top_row['fullname']}**  
-                `ID: {top_row['employee_id']}`  
-                **Final Match Score:** {top_row['final_match_rate']:.2f}
+                **{top_fullname}**  
+                `ID: {top_id}`  
+                **Final Match Score:** {top_score:.2f}
                 """
             )
 
         with col2:
-            st.metric("Final Match", f"{top_row['final_match_rate']:.2f}")
+            st.metric("Final Match", f"{top_score:.2f}")
 
         # Download
         st.markdown("### ⬇️ Download Results")
-        csv = df_view.to_csv(index=False).encode("utf-8")
+        st.caption("CSV (UTF-8): header dan semua kolom teks selalu diapit tanda kutip (\"...\"), angka tanpa kutip.")
+        sink = pa.BufferOutputStream()
+        pacsv.write_csv(pa.Table.from_pandas(df_view, preserve_index=False), sink)
+        csv = sink.getvalue().to_pybytes()
         st.download_button(
             label="Download CSV",
             data=csv,
@@ -349,5 +525,4 @@ if run_button:
             mime="text/csv"
         )
 
-else:
-    st.info("Set benchmark di sidebar, lalu klik **Run Talent Match** untuk melihat ranking.")
+render_results()
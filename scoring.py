@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------------
+# CLIENT-SIDE SCORING (tanpa Streamlit / DB, dipakai app.py)
+# -------------------------------------------------
+# Semantik mengikuti SQL engine lama:
+#   tgv_match_rate   = SUM(tv_match_rate * tv_weight) / SUM(tv_weight)
+#                      (baris dengan rate NULL tetap ikut di penyebut)
+#   final_match_rate = SUM(tgv_match_rate * tgv_weight), TGV NULL diabaikan
+
+
+def build_weight_matrices(mapping_df: pd.DataFrame):
+    # Dari talent_variables_mapping (tv_name, tgv_name, tv_weight):
+    # W (n_tv, n_tgv): W[i, j] = bobot TV i di TGV j; A[i, j] = TV i ter-mapping ke TGV j
+    tv_names = np.sort(mapping_df["tv_name"].unique())
+    tgv_names = np.sort(mapping_df["tgv_name"].unique())
+    idx = (np.searchsorted(tv_names, mapping_df["tv_name"]), np.searchsorted(tgv_names, mapping_df["tgv_name"]))
+    W = np.zeros((len(tv_names), len(tgv_names)))
+    np.add.at(W, idx, mapping_df["tv_weight"].to_numpy(dtype=float))
+    A = np.zeros(W.shape, dtype=bool)
+    A[idx] = True
+    return tv_names, tgv_names, W, A
+
+
+def compute_tv_match(scores_df: pd.DataFrame, baseline_df: pd.DataFrame) -> pd.DataFrame:
+    # tv_match_rate per (employee, TV): numeric & PAPI relatif ke baseline, kategorikal 100 / 0
+    df = scores_df.merge(baseline_df, on="tv_name", how="inner")
+
+    user = df["user_score"].astype(float)
+    base = df["baseline_score"].astype(float)
+    base = base.where(base != 0)  # NULLIF(baseline_score, 0)
+
+    rate = np.where(
+        df["is_reverse"].astype(bool),
+        (2 * base - user) / base * 100,
+        user / base * 100,
+    )
+    rate = np.where(
+        df["tv_source"].eq("cat"),
+        np.where(df["user_value"].eq(df["baseline_value"]), 100.0, 0.0),
+        rate,
+    )
+
+    return pd.DataFrame({
+        "employee_id": df["employee_id"],
+        "tv_name": df["tv_name"],
+        "tv_match_rate": rate,
+    })
+
+
+def compute_final_match_rates(tv_df: pd.DataFrame, tv_names, tgv_names,
+                              W: np.ndarray, A: np.ndarray, g: pd.Series) -> pd.DataFrame:
+    # W[i, j] = bobot TV i di TGV j, A[i, j] = TV i ter-mapping ke TGV j, g = bobot per TGV
+    # 🔹 sum / size / count per (employee, TV): size = baris yang ada (penyebut), count = rate non-NULL
+    stats = tv_df.groupby(["employee_id", "tv_name"])["tv_match_rate"].agg(["sum", "size", "count"])
+    employee_ids = stats.index.unique("employee_id").sort_values()
+
+    def matrix(col):
+        wide = stats[col].unstack("tv_name", fill_value=0)
+        return wide.reindex(index=employee_ids, columns=tv_names, fill_value=0).to_numpy(dtype=float)
+
+    S, P, C = matrix("sum"), matrix("size"), matrix("count")
+    A = A.astype(float)
+
+    num = S @ W
+    den = P @ W
+    # SUM(rate * w) NULL jika semua rate di TGV tsb NULL → tgv_match_rate NULL
+    has_value = (C @ A) > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tgv = np.where(has_value & (den != 0), num / den, np.nan)
+
+    # TGV tanpa bobot di talent_group_weights tidak ikut (INNER JOIN di SQL)
+    contrib = tgv * g.reindex(tgv_names).to_numpy(dtype=float)
+    has_contrib = ~np.isnan(contrib)
+
+    return pd.DataFrame({
+        "employee_id": employee_ids,
+        "final_match_rate": np.where(has_contrib.any(axis=1), np.nansum(contrib, axis=1), np.nan),
+    }).dropna(subset=["final_match_rate"])
@@ -0,0 +1,154 @@
+-- -------------------------------------------------
+-- 001. BASELINE MATERIALIZED VIEWS (Mode B – role-based)
+-- -------------------------------------------------
+-- Baseline per (role_position_id, min_rating) dihitung sekali lalu di-refresh
+-- terjadwal, sehingga app.py tidak perlu menjalankan PERCENTILE_DISC / MODE()
+-- di atas competencies_yearly, profiles_psych, dan papi_scores setiap klik.
+-- min_rating mengikuti slider di sidebar (1–5).
+--
+-- Mode A (manual HP) tetap dihitung on-the-fly di build_baseline_sql (app.py).
+
+
+-- 🔹 Benchmark per role & min_rating (termasuk fallback ke semua HP
+--    jika role tersebut tidak punya HP)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_role_final_bench AS
+WITH ratings AS (
+    SELECT generate_series(1, 5) AS min_rating
+),
+
+role_set AS (
+    SELECT DISTINCT e.position_id AS role_position_id, r.min_rating, e.employee_id
+    FROM employees e
+    JOIN performance_yearly py USING(employee_id)
+    JOIN ratings r ON py.rating >= r.min_rating
+    WHERE e.position_id IS NOT NULL
+),
+
+fallback_benchmark AS (
+    SELECT DISTINCT d.position_id AS role_position_id, r.min_rating, py.employee_id
+    FROM dim_positions d
+    CROSS JOIN ratings r
+    JOIN performance_yearly py ON py.rating >= r.min_rating
+    WHERE NOT EXISTS (
+        SELECT 1 FROM role_set rs
+        WHERE rs.role_position_id = d.position_id
+          AND rs.min_rating = r.min_rating
+    )
+)
+
+SELECT role_position_id, min_rating, employee_id FROM role_set
+UNION
+SELECT role_position_id, min_rating, employee_id FROM fallback_benchmark;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_role_final_bench_uq
+    ON mv_role_final_bench (role_position_id, min_rating, employee_id);
+
+
+-- 🔹 Baseline numeric (competency pillar + psikometri)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_baseline_numeric_by_role AS
+WITH latest AS (
+    SELECT (SELECT MAX(year) FROM competencies_yearly) AS comp_year
+),
+
+bench_scores AS (
+    SELECT fb.role_position_id, fb.min_rating, c.pillar_code AS tv_name, c.score::numeric AS score
+    FROM mv_role_final_bench fb
+    JOIN competencies_yearly c ON c.employee_id = fb.employee_id
+    JOIN latest l ON c.year = l.comp_year
+
+    UNION ALL
+    SELECT fb.role_position_id, fb.min_rating, v.tv_name, v.score
+    FROM mv_role_final_bench fb
+    JOIN profiles_psych p ON p.employee_id = fb.employee_id
+    CROSS JOIN LATERAL (VALUES
+        ('iq', p.iq::numeric), ('gtq', p.gtq::numeric), ('tiki', p.tiki::numeric),
+        ('faxtor', p.faxtor::numeric), ('pauli', p.pauli::numeric)
+    ) AS v(tv_name, score)
+)
+
+SELECT
+    role_position_id,
+    min_rating,
+    tv_name,
+    PERCENTILE_DISC(0.5) WITHIN GROUP (ORDER BY score) AS baseline_score
+FROM bench_scores
+GROUP BY role_position_id, min_rating, tv_name;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_baseline_numeric_by_role_uq
+    ON mv_baseline_numeric_by_role (role_position_id, min_rating, tv_name);
+
+
+-- 🔹 Baseline PAPI (termasuk flag reverse scale)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_baseline_papi_by_role AS
+SELECT
+    fb.role_position_id,
+    fb.min_rating,
+    ps.scale_code AS tv_name,
+    PERCENTILE_DISC(0.5) WITHIN GROUP (ORDER BY ps.score) AS baseline_score,
+    ps.scale_code IN ('Papi_I','Papi_K','Papi_Z','Papi_T') AS is_reverse
+FROM mv_role_final_bench fb
+JOIN papi_scores ps ON ps.employee_id = fb.employee_id
+GROUP BY fb.role_position_id, fb.min_rating, ps.scale_code;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_baseline_papi_by_role_uq
+    ON mv_baseline_papi_by_role (role_position_id, min_rating, tv_name);
+
+
+-- 🔹 Baseline kategorikal (MBTI & DISC)
+--    Selalu satu baris per (role, min_rating, tv_name); baseline_value NULL jika
+--    benchmark tidak punya profil psikologi (semua karyawan mendapat skor 0).
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_baseline_cat_by_role AS
+WITH bench_keys AS (
+    SELECT d.position_id AS role_position_id, r.min_rating
+    FROM dim_positions d
+    CROSS JOIN generate_series(1, 5) AS r(min_rating)
+),
+
+cat_tv AS (
+    SELECT tv_name FROM (VALUES ('mbti'), ('disc')) AS t(tv_name)
+),
+
+bench_values AS (
+    SELECT fb.role_position_id, fb.min_rating, v.tv_name, v.user_value
+    FROM mv_role_final_bench fb
+    JOIN profiles_psych p ON p.employee_id = fb.employee_id
+    CROSS JOIN LATERAL (VALUES
+        ('mbti', UPPER(TRIM(p.mbti))), ('disc', UPPER(TRIM(p.disc)))
+    ) AS v(tv_name, user_value)
+)
+
+SELECT
+    k.role_position_id,
+    k.min_rating,
+    ct.tv_name,
+    MODE() WITHIN GROUP (ORDER BY bv.user_value) AS baseline_value
+FROM bench_keys k
+CROSS JOIN cat_tv ct
+LEFT JOIN bench_values bv ON bv.role_position_id = k.role_position_id
+                         AND bv.min_rating = k.min_rating
+                         AND bv.tv_name = ct.tv_name
+GROUP BY k.role_position_id, k.min_rating, ct.tv_name;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_baseline_cat_by_role_uq
+    ON mv_baseline_cat_by_role (role_position_id, min_rating, tv_name);
+
+
+-- -------------------------------------------------
+-- REFRESH
+-- -------------------------------------------------
+-- CONCURRENTLY butuh unique index di atas dan tidak mem-block SELECT dari app.
+-- Urutan penting: mv_role_final_bench harus di-refresh lebih dulu.
+
+CREATE OR REPLACE FUNCTION refresh_baseline_mvs() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_role_final_bench;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_baseline_numeric_by_role;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_baseline_papi_by_role;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_baseline_cat_by_role;
+END;
+$$;
+
+-- 🔹 Jadwal nightly (Supabase: aktifkan extension pg_cron terlebih dahulu)
+CREATE EXTENSION IF NOT EXISTS pg_cron;
+SELECT cron.schedule('refresh-baseline-mvs', '0 2 * * *', $$SELECT refresh_baseline_mvs()$$);
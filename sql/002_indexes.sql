@@ -0,0 +1,14 @@
+-- -------------------------------------------------
+-- 002. INDEXES FOR BENCHMARK JOINS
+-- -------------------------------------------------
+-- final_bench di-join (bukan IN-subquery) ke tabel skor; index ini
+-- memungkinkan planner memilih index/merge join per employee_id.
+
+CREATE INDEX IF NOT EXISTS profiles_psych_employee_id_idx
+    ON profiles_psych (employee_id);
+
+CREATE INDEX IF NOT EXISTS competencies_yearly_employee_id_year_idx
+    ON competencies_yearly (employee_id, year);
+
+CREATE INDEX IF NOT EXISTS papi_scores_employee_id_idx
+    ON papi_scores (employee_id);
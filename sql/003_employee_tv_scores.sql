@@ -0,0 +1,60 @@
+-- -------------------------------------------------
+-- 003. EMPLOYEE TV SCORES (long format, satu tabel untuk semua sumber TV)
+-- -------------------------------------------------
+-- Gabungan competencies_yearly (tahun terakhir), profiles_psych (numeric &
+-- kategorikal) dan papi_scores, sehingga build_baseline_sql / build_scores_sql
+-- cukup membaca satu relasi ber-index alih-alih UNION ALL tiga sumber setiap klik.
+--
+--   tv_source  : 'competency' | 'psych' | 'papi' | 'cat'
+--   user_score : skor numeric (NULL untuk 'cat')
+--   user_value : nilai kategorikal ter-normalisasi UPPER(TRIM(..)) (hanya 'cat')
+
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS employee_tv_scores AS
+WITH latest AS (
+    SELECT (SELECT MAX(year) FROM competencies_yearly) AS comp_year
+)
+
+SELECT c.employee_id, 'competency' AS tv_source, c.pillar_code AS tv_name,
+       c.score::numeric AS user_score, NULL::text AS user_value
+FROM competencies_yearly c
+JOIN latest l ON c.year = l.comp_year
+
+UNION ALL
+SELECT p.employee_id, 'psych', v.tv_name, v.user_score, NULL
+FROM profiles_psych p
+CROSS JOIN LATERAL (VALUES
+    ('iq', p.iq::numeric), ('gtq', p.gtq::numeric), ('tiki', p.tiki::numeric),
+    ('faxtor', p.faxtor::numeric), ('pauli', p.pauli::numeric)
+) AS v(tv_name, user_score)
+
+UNION ALL
+SELECT ps.employee_id, 'papi', ps.scale_code, ps.score::numeric, NULL
+FROM papi_scores ps
+
+UNION ALL
+SELECT p.employee_id, 'cat', v.tv_name, NULL, v.user_value
+FROM profiles_psych p
+CROSS JOIN LATERAL (VALUES
+    ('mbti', UPPER(TRIM(p.mbti))), ('disc', UPPER(TRIM(p.disc)))
+) AS v(tv_name, user_value);
+
+-- 🔹 Unique index (wajib untuk REFRESH ... CONCURRENTLY)
+CREATE UNIQUE INDEX IF NOT EXISTS employee_tv_scores_uq
+    ON employee_tv_scores (tv_name, employee_id, tv_source);
+
+CREATE INDEX IF NOT EXISTS employee_tv_scores_source_idx
+    ON employee_tv_scores (tv_source, employee_id);
+
+
+-- -------------------------------------------------
+-- REFRESH
+-- -------------------------------------------------
+-- Jalankan setelah ETL selesai:
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY employee_tv_scores;
+
+-- 🔹 Jadwal nightly, sebelum refresh-baseline-mvs (02:00)
+SELECT cron.schedule(
+    'refresh-employee-tv-scores', '30 1 * * *',
+    $$REFRESH MATERIALIZED VIEW CONCURRENTLY employee_tv_scores$$
+);
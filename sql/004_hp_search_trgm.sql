@@ -0,0 +1,13 @@
+-- -------------------------------------------------
+-- 004. TRIGRAM INDEX UNTUK TYPEAHEAD HIGH PERFORMER
+-- -------------------------------------------------
+-- search_high_performers() memakai ILIKE pada employee_id / fullname;
+-- index GIN trigram membuat pencarian ini index scan, bukan full scan employees.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS employees_fullname_trgm_idx
+    ON employees USING gin (fullname gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS employees_employee_id_trgm_idx
+    ON employees USING gin (employee_id gin_trgm_ops);
@@ -0,0 +1,98 @@
+-- -------------------------------------------------
+-- 005. EMPLOYEE HP RATINGS (flag High Performer per karyawan)
+-- -------------------------------------------------
+-- Rating tertinggi per karyawan dari performance_yearly. Karyawan adalah HP
+-- untuk min_rating tertentu jika max_rating >= min_rating, sehingga sidebar
+-- dan role_set / fallback_benchmark tidak perlu join + DISTINCT atas
+-- performance_yearly setiap klik. Dijaga tetap sinkron oleh trigger.
+
+
+CREATE TABLE IF NOT EXISTS employee_hp_ratings (
+    employee_id text PRIMARY KEY,
+    max_rating  numeric NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS employee_hp_ratings_max_rating_idx
+    ON employee_hp_ratings (max_rating);
+
+-- 🔹 Trigger menghitung MAX(rating) per employee_id untuk setiap baris yang
+--    berubah; tanpa index ini bulk load ETL menjadi O(rows × tabel)
+CREATE INDEX IF NOT EXISTS performance_yearly_employee_id_rating_idx
+    ON performance_yearly (employee_id, rating);
+
+-- 🔹 Rebuild penuh (backfill awal & setelah TRUNCATE performance_yearly)
+CREATE OR REPLACE FUNCTION rebuild_employee_hp_ratings() RETURNS void
+LANGUAGE sql AS $$
+    DELETE FROM employee_hp_ratings;
+
+    INSERT INTO employee_hp_ratings (employee_id, max_rating)
+    SELECT employee_id, MAX(rating)
+    FROM performance_yearly
+    WHERE rating IS NOT NULL
+    GROUP BY employee_id;
+$$;
+
+SELECT rebuild_employee_hp_ratings();
+
+
+-- -------------------------------------------------
+-- TRIGGER SYNC
+-- -------------------------------------------------
+
+CREATE OR REPLACE FUNCTION refresh_employee_hp_rating(emp text) RETURNS void
+LANGUAGE sql AS $$
+    -- Serialisasi per karyawan sampai commit. Statement terpisah: di READ COMMITTED
+    -- setiap statement berikut mengambil snapshot baru, sehingga MAX(rating) sudah
+    -- melihat rating dari transaksi lain yang commit lebih dulu (tanpa lost update).
+    SELECT pg_advisory_xact_lock(hashtext(emp));
+
+    -- Upsert (bukan DELETE + INSERT) supaya tidak bentrok di primary key
+    INSERT INTO employee_hp_ratings (employee_id, max_rating)
+    SELECT employee_id, MAX(rating)
+    FROM performance_yearly
+    WHERE employee_id = emp
+      AND rating IS NOT NULL
+    GROUP BY employee_id
+    ON CONFLICT (employee_id) DO UPDATE SET max_rating = EXCLUDED.max_rating;
+
+    -- Hapus hanya jika tidak ada lagi rating non-NULL
+    DELETE FROM employee_hp_ratings hr
+    WHERE hr.employee_id = emp
+      AND NOT EXISTS (
+          SELECT 1 FROM performance_yearly py
+          WHERE py.employee_id = emp
+            AND py.rating IS NOT NULL
+      );
+$$;
+
+CREATE OR REPLACE FUNCTION sync_employee_hp_rating() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_employee_hp_rating(OLD.employee_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM refresh_employee_hp_rating(NEW.employee_id);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS performance_yearly_hp_rating_sync ON performance_yearly;
+CREATE TRIGGER performance_yearly_hp_rating_sync
+    AFTER INSERT OR UPDATE OR DELETE ON performance_yearly
+    FOR EACH ROW EXECUTE FUNCTION sync_employee_hp_rating();
+
+-- 🔹 TRUNCATE tidak memicu trigger per baris → rebuild setelah reload berbasis TRUNCATE
+CREATE OR REPLACE FUNCTION sync_employee_hp_ratings_truncate() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM rebuild_employee_hp_ratings();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS performance_yearly_hp_rating_truncate ON performance_yearly;
+CREATE TRIGGER performance_yearly_hp_rating_truncate
+    AFTER TRUNCATE ON performance_yearly
+    FOR EACH STATEMENT EXECUTE FUNCTION sync_employee_hp_ratings_truncate();
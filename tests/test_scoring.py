@@ -0,0 +1,162 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scoring import build_weight_matrices, compute_final_match_rates, compute_tv_match
+
+# Agregasi TV → TGV → final dari SQL engine lama, dipakai sebagai referensi
+REFERENCE_SQL = """
+WITH tgv_match AS (
+    SELECT tm.employee_id, m.tgv_name,
+           SUM(tm.tv_match_rate * m.tv_weight) / SUM(m.tv_weight) AS tgv_match_rate
+    FROM tv_match tm
+    JOIN talent_variables_mapping m ON m.tv_name = tm.tv_name
+    GROUP BY tm.employee_id, m.tgv_name
+)
+SELECT t.employee_id, SUM(t.tgv_match_rate * w.tgv_weight) AS final_match_rate
+FROM tgv_match t
+JOIN talent_group_weights w ON w.tgv_name = t.tgv_name
+GROUP BY t.employee_id
+HAVING SUM(t.tgv_match_rate * w.tgv_weight) IS NOT NULL
+ORDER BY t.employee_id
+"""
+
+
+# CASE tv_match_rate dari all_tv (numeric_tv / papi_tv / categorical_tv) di SQL engine lama
+REFERENCE_TV_SQL = """
+SELECT
+    sc.employee_id,
+    sc.tv_name,
+    CASE
+        WHEN sc.tv_source = 'cat' THEN
+            CASE WHEN sc.user_value = b.baseline_value THEN 100.0 ELSE 0.0 END
+        WHEN b.is_reverse THEN ((2 * b.baseline_score - sc.user_score) / NULLIF(b.baseline_score, 0)) * 100
+        ELSE (sc.user_score / NULLIF(b.baseline_score, 0)) * 100
+    END AS tv_match_rate
+FROM scores sc
+JOIN baselines b ON b.tv_name = sc.tv_name
+ORDER BY sc.employee_id, sc.tv_name
+"""
+
+
+def run_reference(tv_df, mapping, group_weights) -> pd.DataFrame:
+    with sqlite3.connect(":memory:") as conn:
+        tv_df.to_sql("tv_match", conn, index=False)
+        mapping.to_sql("talent_variables_mapping", conn, index=False)
+        group_weights.to_sql("talent_group_weights", conn, index=False)
+        return pd.read_sql(REFERENCE_SQL, conn)
+
+
+def run_client(tv_df, mapping, group_weights) -> pd.DataFrame:
+    tv_names, tgv_names, W, A = build_weight_matrices(mapping)
+    g = group_weights.groupby("tgv_name")["tgv_weight"].sum().astype(float)
+    result = compute_final_match_rates(tv_df, tv_names, tgv_names, W, A, g)
+    return result.sort_values("employee_id").reset_index(drop=True)
+
+
+def test_build_weight_matrices():
+    mapping = pd.DataFrame({
+        "tv_name": ["b", "a", "a", "c"],
+        "tgv_name": ["T2", "T1", "T1", "T2"],
+        "tv_weight": [0.0, 0.25, 0.5, 2.0],
+    })
+
+    tv_names, tgv_names, W, A = build_weight_matrices(mapping)
+
+    assert tv_names.tolist() == ["a", "b", "c"]
+    assert tgv_names.tolist() == ["T1", "T2"]
+    # Baris mapping ganda dijumlahkan (SUM di SQL), bobot 0 tetap ter-mapping
+    np.testing.assert_allclose(W, [[0.75, 0.0], [0.0, 0.0], [0.0, 2.0]])
+    assert A.tolist() == [[True, False], [False, True], [False, True]]
+
+
+def test_null_rate_stays_in_denominator():
+    tv_df = pd.DataFrame({
+        "employee_id": ["E1", "E1", "E2", "E2"],
+        "tv_name": ["a", "b", "a", "b"],
+        "tv_match_rate": [100.0, np.nan, 100.0, 50.0],
+    })
+    mapping = pd.DataFrame({"tv_name": ["a", "b"], "tgv_name": ["T", "T"], "tv_weight": [1.0, 1.0]})
+    group_weights = pd.DataFrame({"tgv_name": ["T"], "tgv_weight": [1.0]})
+
+    result = run_client(tv_df, mapping, group_weights)
+
+    assert result["employee_id"].tolist() == ["E1", "E2"]
+    assert result["final_match_rate"].tolist() == pytest.approx([50.0, 75.0])
+
+
+def test_matches_reference_sql():
+    rng = np.random.default_rng(0)
+    mapping = pd.DataFrame({
+        "tv_name": ["a", "b", "c", "d", "e", "mbti"],
+        "tgv_name": ["T1", "T1", "T2", "T2", "T3", "T4"],
+        "tv_weight": [0.6, 0.4, 1.0, 2.0, 1.0, 1.0],
+    })
+    # T4 tidak punya bobot TGV → tidak ikut final_match_rate
+    group_weights = pd.DataFrame({"tgv_name": ["T1", "T2", "T3"], "tgv_weight": [0.5, 0.3, 0.2]})
+
+    rows = [
+        (f"E{i}", tv, rng.choice([np.nan, *rng.uniform(0, 150, 3)]))
+        for i in range(40)
+        for tv in ["a", "b", "c", "d", "e", "mbti", "unmapped"]
+        if rng.random() < 0.8
+    ]
+    # Karyawan yang semua rate-nya NULL tidak diranking
+    rows += [("E_null", "a", np.nan), ("E_null", "c", np.nan)]
+    tv_df = pd.DataFrame(rows, columns=["employee_id", "tv_name", "tv_match_rate"])
+
+    expected = run_reference(tv_df, mapping, group_weights)
+    result = run_client(tv_df, mapping, group_weights)
+
+    assert "E_null" not in result["employee_id"].tolist()
+    assert result["employee_id"].tolist() == expected["employee_id"].tolist()
+    np.testing.assert_allclose(result["final_match_rate"], expected["final_match_rate"])
+
+
+def test_tv_match_matches_reference_case():
+    baselines = pd.DataFrame({
+        "tv_name": ["gtq", "iq", "Papi_N", "Papi_I", "Papi_T", "pauli", "mbti", "disc", "no_scores"],
+        "baseline_score": [100.0, 0.0, 6.0, 4.0, 0.0, 50.0, np.nan, np.nan, 10.0],
+        "is_reverse": [False, False, False, True, True, False, False, False, False],
+        "baseline_value": [None, None, None, None, None, None, "INTJ", None, None],
+    })
+    scores = pd.DataFrame([
+        ("E1", "competency", "gtq", 80.0, None),
+        ("E1", "psych", "iq", 120.0, None),       # NULLIF(baseline, 0) → NULL
+        ("E1", "papi", "Papi_N", 3.0, None),
+        ("E1", "papi", "Papi_I", 5.0, None),      # reverse: (2*4 - 5) / 4 * 100
+        ("E1", "papi", "Papi_T", 7.0, None),      # reverse, baseline 0 → NULL
+        ("E1", "psych", "pauli", np.nan, None),   # user score NULL → NULL
+        ("E1", "cat", "mbti", np.nan, "INTJ"),    # match → 100
+        ("E1", "cat", "disc", np.nan, "D"),       # baseline NULL → 0
+        ("E2", "cat", "mbti", np.nan, "ENFP"),    # beda → 0
+        ("E2", "cat", "disc", np.nan, None),      # user & baseline NULL → 0
+        ("E3", "cat", "mbti", np.nan, None),      # user NULL → 0
+        ("E2", "papi", "Papi_I", 2.0, None),
+        ("E2", "competency", "unmapped", 90.0, None),  # tanpa baseline → hilang (INNER JOIN)
+    ], columns=["employee_id", "tv_source", "tv_name", "user_score", "user_value"])
+
+    with sqlite3.connect(":memory:") as conn:
+        scores.to_sql("scores", conn, index=False)
+        baselines.to_sql("baselines", conn, index=False)
+        expected = pd.read_sql(REFERENCE_TV_SQL, conn)
+
+    result = (
+        compute_tv_match(scores, baselines)
+        .sort_values(["employee_id", "tv_name"])
+        .reset_index(drop=True)
+    )
+
+    assert "unmapped" not in result["tv_name"].tolist()
+    assert "no_scores" not in result["tv_name"].tolist()
+    assert result[["employee_id", "tv_name"]].values.tolist() == expected[["employee_id", "tv_name"]].values.tolist()
+    np.testing.assert_allclose(result["tv_match_rate"], expected["tv_match_rate"].astype(float))
+
+    rate = result.set_index(["employee_id", "tv_name"])["tv_match_rate"]
+    assert rate["E1", "gtq"] == pytest.approx(80.0)
+    assert rate["E1", "Papi_I"] == pytest.approx(75.0)
+    assert np.isnan(rate["E1", "iq"]) and np.isnan(rate["E1", "Papi_T"]) and np.isnan(rate["E1", "pauli"])
+    assert rate["E1", "mbti"] == 100.0
+    assert rate["E1", "disc"] == rate["E2", "mbti"] == rate["E2", "disc"] == rate["E3", "mbti"] == 0.0